@@ -49,10 +49,13 @@ Usage example
   cluster32
 """
 
+from collections import Counter, defaultdict, OrderedDict
 import fnmatch
+from itertools import chain
 import re
 import string
 import sys
+import threading
 
 # Python 3 compatibility
 try:
@@ -85,6 +88,14 @@ RESOLVER_NOINIT = -2
 STD_GROUP_RESOLVER = RESOLVER_STD_GROUP
 NOGROUP_RESOLVER = RESOLVER_NOGROUP
 
+# Sentinel object used for single lookup of possibly None dict values
+_MISSING = object()
+
+# ParsingEngine objects shared by NodeSets and commodity functions, see
+# _std_parser() and _parser_for()
+_STD_PARSER = None
+_NOGROUP_PARSER = None
+
 
 class NodeSetException(Exception):
     """Base NodeSet exception class."""
@@ -134,8 +145,9 @@ class NodeSetBase(object):
                  autostep=None, fold_axis=None):
         """New NodeSetBase object initializer"""
         self._autostep = autostep
-        self._length = 0
+        self._length = 0          # cached number of nodes (None if unknown)
         self._patterns = {}
+        self._sorted_pats = None  # cached sorted list of patterns
         self.fold_axis = fold_axis  #: iterable over nD 0-indexed axis
         if self.fold_axis is None and DEFAULTS.fold_axis:
             self.fold_axis = DEFAULTS.fold_axis  # non-empty tuple
@@ -163,10 +175,18 @@ class NodeSetBase(object):
 
     autostep = property(get_autostep, set_autostep)
 
+    def _sorted_patitems(self):
+        """Get list of (pattern, rangeset) items sorted by pattern. Sorted
+        patterns are cached until the set of patterns is modified."""
+        if self._sorted_pats is None:
+            self._sorted_pats = sorted(self._patterns)
+        patterns = self._patterns
+        return [(pat, patterns[pat]) for pat in self._sorted_pats]
+
     def _iter(self):
         """Iterator on internal item tuples
             (pattern, indexes, padding, autostep)."""
-        for pat, rset in sorted(self._patterns.items()):
+        for pat, rset in self._sorted_patitems():
             if rset:
                 autostep = rset.autostep
                 if rset.dim() == 1:
@@ -182,27 +202,52 @@ class NodeSetBase(object):
 
     def _iterbase(self):
         """Iterator on single, one-item NodeSetBase objects."""
-        for pat, ivec, pad, autostep in self._iter():
-            rset = None     # 'no node index' by default
-            if ivec is not None:
-                assert len(ivec) > 0
-                if len(ivec) == 1:
-                    rset = RangeSet.fromone(ivec[0], pad[0] or 0, autostep)
+        # Does not call self._iter() for better performance; new rangesets
+        # are not referenced elsewhere so they don't need to be copied.
+        for pat, rset in self._sorted_patitems():
+            if rset:
+                autostep = rset.autostep
+                if rset.dim() == 1:
+                    pad = rset.padding or 0
+                    for idx in rset._sorted():
+                        yield NodeSetBase(pat,
+                                          RangeSet.fromone(idx, pad, autostep),
+                                          False)
                 else:
-                    rset = RangeSetND([ivec], pad, autostep)
-            yield NodeSetBase(pat, rset)
+                    for ivec, pads in rset.iter_padding():
+                        yield NodeSetBase(pat,
+                                          RangeSetND([ivec], pads, autostep),
+                                          False)
+            else:
+                yield NodeSetBase(pat)
+
+    def _iterkeys(self):
+        """Iterator on (pattern, index) tuples where index is an integer,
+        a tuple of integers or None. Padding is ignored."""
+        for pat, rset in self._patterns.items():
+            if rset:
+                for idx in rset:
+                    yield pat, idx
+            else:
+                yield pat, None
 
     def __iter__(self):
         """Iterator on single nodes as string."""
         # Does not call self._iterbase() + str() for better performance.
-        for pat, ivec, pads, _ in self._iter():
-            if ivec is not None:
+        for pat, rset in self._sorted_patitems():
+            if rset:
                 # For performance reasons, add a special case for 1D RangeSet
-                if len(ivec) == 1:
-                    yield pat % ("%0*d" % (pads[0] or 0, ivec[0]))
+                if rset.dim() == 1:
+                    # build node format string once per pattern, keeping
+                    # escaped '%%' characters for the final formatting
+                    fmt = pat.replace('%%', '%%%%') % \
+                        ("%%0%dd" % (rset.padding or 0))
+                    for idx in rset._sorted():
+                        yield fmt % idx
                 else:
-                    yield pat % tuple(["%0*d" % (pad or 0, i) \
-                                      for pad, i in zip(pads, ivec)])
+                    for ivec, pads in rset.iter_padding():
+                        yield pat % tuple(["%0*d" % (pad or 0, i) \
+                                          for pad, i in zip(pads, ivec)])
             else:
                 yield pat % ()
 
@@ -214,24 +259,32 @@ class NodeSetBase(object):
 
     def nsiter(self):
         """Object-based NodeSet iterator on single nodes."""
-        for pat, ivec, pads, autostep in self._iter():
-            nodeset = self.__class__()
-            if ivec is not None:
-                if len(ivec) == 1:
-                    pad = pads[0] or 0
-                    nodeset._add_new(pat, RangeSet.fromone(ivec[0], pad))
+        for pat, rset in self._sorted_patitems():
+            if rset:
+                if rset.dim() == 1:
+                    pad = rset.padding or 0
+                    for idx in rset._sorted():
+                        nodeset = self.__class__()
+                        nodeset._add_new(pat, RangeSet.fromone(idx, pad))
+                        yield nodeset
                 else:
-                    nodeset._add_new(pat, RangeSetND([ivec], pads, autostep))
+                    autostep = rset.autostep
+                    for ivec, pads in rset.iter_padding():
+                        nodeset = self.__class__()
+                        nodeset._add_new(pat,
+                                         RangeSetND([ivec], pads, autostep))
+                        yield nodeset
             else:
+                nodeset = self.__class__()
                 nodeset._add_new(pat, None)
-            yield nodeset
+                yield nodeset
 
     def contiguous(self):
         """Object-based NodeSet iterator on contiguous node sets.
 
         Contiguous node set contains nodes with same pattern name and a
         contiguous range of indexes, like foobar[1-100]."""
-        for pat, rangeset in sorted(self._patterns.items()):
+        for pat, rangeset in self._sorted_patitems():
             if rangeset:
                 for cont_rset in rangeset.contiguous():
                     nodeset = self.__class__()
@@ -244,13 +297,15 @@ class NodeSetBase(object):
 
     def __len__(self):
         """Get the number of nodes in NodeSet."""
-        cnt = 0
-        for rangeset in self._patterns.values():
-            if rangeset:
-                cnt += len(rangeset)
-            else:
-                cnt += 1
-        return cnt
+        if self._length is None:
+            cnt = 0
+            for rangeset in self._patterns.values():
+                if rangeset:
+                    cnt += len(rangeset)
+                else:
+                    cnt += 1
+            self._length = cnt
+        return self._length
 
     def _iter_nd_pat(self, pat, rset):
         """
@@ -299,7 +354,7 @@ class NodeSetBase(object):
         """Get ranges-based pattern of node list."""
         results = []
         try:
-            for pat, rset in sorted(self._patterns.items()):
+            for pat, rset in self._sorted_patitems():
                 if not rset:
                     results.append(pat % ())
                 elif rset.dim() == 1:
@@ -320,11 +375,16 @@ class NodeSetBase(object):
                                          "ranges mismatch")
         return ",".join(results)
 
-    def copy(self):
-        """Return a shallow copy."""
+    def _empty_copy(self):
+        """Return a new empty object with the same settings."""
         cpy = self.__class__()
         cpy.fold_axis = self.fold_axis
         cpy._autostep = self._autostep
+        return cpy
+
+    def copy(self):
+        """Return a shallow copy."""
+        cpy = self._empty_copy()
         cpy._length = self._length
         dic = {}
         for pat, rangeset in self._patterns.items():
@@ -349,16 +409,25 @@ class NodeSetBase(object):
     def issubset(self, other):
         """Report whether another nodeset contains this nodeset."""
         self._binary_sanity_check(other)
-        return other.issuperset(self)
+        return other._issuperset(self)
 
     def issuperset(self, other):
         """Report whether this nodeset contains another nodeset."""
         self._binary_sanity_check(other)
+        return self._issuperset(other)
+
+    def _issuperset(self, other):
+        """Private issuperset() without type checking."""
+        # early rejection using (cached) lengths
+        if len(self) < len(other):
+            return False
         status = True
         for pat, erangeset in other._patterns.items():
             rangeset = self._patterns.get(pat)
             if rangeset:
-                status = rangeset.issuperset(erangeset)
+                # length check is cheaper than RangeSetND.issuperset()
+                status = len(rangeset) >= len(erangeset) and \
+                         rangeset.issuperset(erangeset)
             else:
                 # might be an unnumbered node (key in dict but no value)
                 status = pat in self._patterns
@@ -371,7 +440,9 @@ class NodeSetBase(object):
         # See comment for for RangeSet.__eq__()
         if not isinstance(other, NodeSetBase):
             return NotImplemented
-        return len(self) == len(other) and self.issuperset(other)
+        # equal nodesets have the same patterns
+        return len(self._patterns) == len(other._patterns) and \
+               len(self) == len(other) and self._issuperset(other)
 
     # inequality comparisons using the is-subset relation
     __le__ = issubset
@@ -380,12 +451,12 @@ class NodeSetBase(object):
     def __lt__(self, other):
         """x.__lt__(y) <==> x<y"""
         self._binary_sanity_check(other)
-        return len(self) < len(other) and self.issubset(other)
+        return len(self) < len(other) and other._issuperset(self)
 
     def __gt__(self, other):
         """x.__gt__(y) <==> x>y"""
         self._binary_sanity_check(other)
-        return len(self) > len(other) and self.issuperset(other)
+        return len(self) > len(other) and self._issuperset(other)
 
     def _extractslice(self, index):
         """Private utility function: extract slice parameters from slice object
@@ -433,7 +504,7 @@ class NodeSetBase(object):
             if sl_stop <= sl_next:
                 return inst
             length = 0
-            for pat, rangeset in sorted(self._patterns.items()):
+            for pat, rangeset in self._sorted_patitems():
                 if rangeset:
                     cnt = len(rangeset)
                     offset = sl_next - length
@@ -467,7 +538,7 @@ class NodeSetBase(object):
                 else:
                     raise IndexError("%d out of range" % index)
             length = 0
-            for pat, rangeset in sorted(self._patterns.items()):
+            for pat, rangeset in self._sorted_patitems():
                 if rangeset:
                     cnt = len(rangeset)
                     if index < length + cnt:
@@ -493,6 +564,9 @@ class NodeSetBase(object):
         referenced (not copied)."""
         assert pat not in self._patterns
         self._patterns[pat] = rangeset
+        self._sorted_pats = None
+        if self._length is not None:
+            self._length += len(rangeset) if rangeset else 1
 
     def _add(self, pat, rangeset, copy_rangeset=True):
         """Add nodes from a (pat, rangeset) tuple.
@@ -500,15 +574,16 @@ class NodeSetBase(object):
         RangeSet or RangeSetND objects are copied if re-used internally
         when provided and if copy_rangeset flag is set.
         """
-        if pat in self._patterns:
-            # existing pattern: get RangeSet or RangeSetND entry...
-            pat_e = self._patterns[pat]
-            # sanity checks
+        # single lookup: get RangeSet or RangeSetND entry, None if entry
+        # exists without rangeset (single node) or _MISSING if not found
+        pat_e = self._patterns.get(pat, _MISSING)
+        if pat_e is not _MISSING:
+            # existing pattern: sanity checks
             if (pat_e is None) is not (rangeset is None):
                 raise NodeSetError("Invalid operation")
-            # entry may exist but set to None (single node)
-            if pat_e:
+            if pat_e is not None:
                 pat_e.update(rangeset)
+                self._length = None
         else:
             # new pattern...
             if rangeset and copy_rangeset:
@@ -554,14 +629,29 @@ class NodeSetBase(object):
         """
         s.updaten(list) updates nodeset s with elements added from given list.
         """
+        # gather rangesets by pattern first, then update each pattern once
+        patd = defaultdict(list)
         for other in others:
-            self.update(other)
+            for pat, rangeset in other._patterns.items():
+                patd[pat].append(rangeset)
+        for pat, rangesets in patd.items():
+            self._add(pat, rangesets[0])
+            if len(rangesets) > 1:
+                pat_e = self._patterns[pat]
+                for rangeset in rangesets[1:]:
+                    if (pat_e is None) is not (rangeset is None):
+                        raise NodeSetError("Invalid operation")
+                    if pat_e is not None:
+                        pat_e.update(rangeset)
+                self._length = None
 
     def clear(self):
         """
         Remove all nodes from this nodeset.
         """
         self._patterns.clear()
+        self._sorted_pats = None
+        self._length = 0
 
     def __ior__(self, other):
         """
@@ -577,9 +667,21 @@ class NodeSetBase(object):
         s.intersection(t) returns a new set with elements common to s
         and t.
         """
-        self_copy = self.copy()
-        self_copy.intersection_update(other)
-        return self_copy
+        # build result directly instead of copying then reducing self
+        result = self._empty_copy()
+        for pat, irangeset in other._patterns.items():
+            rangeset = self._patterns.get(pat, _MISSING)
+            if rangeset is _MISSING:
+                continue
+            if rangeset:
+                irset = rangeset.intersection(irangeset)
+                # ignore pattern if empty rangeset
+                if len(irset) > 0:
+                    result._add_new(pat, irset)
+            elif not irangeset:
+                # intersect two nodes with no rangeset
+                result._add_new(pat, None)
+        return result
 
     def __and__(self, other):
         """
@@ -598,21 +700,12 @@ class NodeSetBase(object):
         if other is self:
             return
 
-        tmp_ns = NodeSetBase()
-
-        for pat, irangeset in other._patterns.items():
-            rangeset = self._patterns.get(pat)
-            if rangeset:
-                irset = rangeset.intersection(irangeset)
-                # ignore pattern if empty rangeset
-                if len(irset) > 0:
-                    tmp_ns._add(pat, irset, copy_rangeset=False)
-            elif not irangeset and pat in self._patterns:
-                # intersect two nodes with no rangeset
-                tmp_ns._add(pat, None)
+        tmp_ns = NodeSetBase.intersection(self, other)
 
         # Substitute
         self._patterns = tmp_ns._patterns
+        self._sorted_pats = None
+        self._length = tmp_ns._length
 
     def __iand__(self, other):
         """
@@ -628,9 +721,20 @@ class NodeSetBase(object):
         ``s.difference(t)`` returns a new NodeSet with elements in s but not
         in t.
         """
-        self_copy = self.copy()
-        self_copy.difference_update(other)
-        return self_copy
+        # build result directly: copy only what remains from self
+        result = self._empty_copy()
+        for pat, rangeset in self._patterns.items():
+            erangeset = other._patterns.get(pat, _MISSING)
+            if erangeset is _MISSING:
+                if rangeset is not None:
+                    rangeset = rangeset.copy()
+                result._add_new(pat, rangeset)
+            elif rangeset:
+                drangeset = rangeset.difference(erangeset)
+                # ignore pattern if empty rangeset
+                if len(drangeset) > 0:
+                    result._add_new(pat, drangeset)
+        return result
 
     def __sub__(self, other):
         """
@@ -648,8 +752,12 @@ class NodeSetBase(object):
         :raises KeyError: an element cannot be removed (only if strict is
             True)
         """
-        # the purge of each empty pattern is done afterward to allow self = ns
-        purge_patterns = []
+        if other is self:
+            # empty patterns are purged while iterating over other
+            self.clear()
+            return
+
+        self._length = None
 
         # iterate first over exclude nodeset rangesets which is usually smaller
         for pat, erangeset in other._patterns.items():
@@ -659,19 +767,18 @@ class NodeSetBase(object):
                 # sub rangeset, raise KeyError if not found
                 rangeset.difference_update(erangeset, strict)
 
-                # check if no range left and add pattern to purge list
+                # purge pattern if no range left
                 if len(rangeset) == 0:
-                    purge_patterns.append(pat)
+                    del self._patterns[pat]
+                    self._sorted_pats = None
             else:
                 # unnumbered node exclusion
                 if pat in self._patterns:
-                    purge_patterns.append(pat)
+                    del self._patterns[pat]
+                    self._sorted_pats = None
                 elif strict:
                     raise KeyError(pat)
 
-        for pat in purge_patterns:
-            del self._patterns[pat]
-
     def __isub__(self, other):
         """
         Implement the -= operator. So ``s -= t`` returns nodeset s after
@@ -715,31 +822,28 @@ class NodeSetBase(object):
         ``s.symmetric_difference_update(t)`` updates nodeset s keeping all
         nodes that are in exactly one of the nodesets.
         """
-        purge_patterns = []
+        if other is self:
+            # empty patterns are purged while iterating over other
+            self.clear()
+            return
 
-        # iterate over our rangesets
-        for pat, rangeset in self._patterns.items():
-            brangeset = other._patterns.get(pat)
-            if brangeset:
-                rangeset.symmetric_difference_update(brangeset)
-            else:
-                if pat in other._patterns:
-                    purge_patterns.append(pat)
+        self._length = None
 
-        # iterate over other's rangesets
+        # only patterns found in other are affected: iterate over them once
         for pat, brangeset in other._patterns.items():
-            rangeset = self._patterns.get(pat)
-            if not rangeset and not pat in self._patterns:
+            rangeset = self._patterns.get(pat, _MISSING)
+            if rangeset is _MISSING:
                 self._add(pat, brangeset)
-
-        # check for patterns cleanup
-        for pat, rangeset in self._patterns.items():
-            if rangeset is not None and len(rangeset) == 0:
-                purge_patterns.append(pat)
-
-        # cleanup
-        for pat in purge_patterns:
-            del self._patterns[pat]
+            elif brangeset:
+                rangeset.symmetric_difference_update(brangeset)
+                # purge pattern if no range left
+                if len(rangeset) == 0:
+                    del self._patterns[pat]
+                    self._sorted_pats = None
+            else:
+                # unnumbered node found in both nodesets
+                del self._patterns[pat]
+                self._sorted_pats = None
 
     def __ixor__(self, other):
         """
@@ -757,7 +861,11 @@ def _strip_escape(nsstr):
     Helper to prepare a nodeset string for parsing: trim boundary
     whitespaces and escape special characters.
     """
-    return nsstr.strip().replace('%', '%%')
+    nsstr = nsstr.strip()
+    # '%' is rarely found in node names: only escape it when needed
+    if '%' in nsstr:
+        nsstr = nsstr.replace('%', '%%')
+    return nsstr
 
 def _rsets4nsb(rsets, autostep):
     """
@@ -770,6 +878,55 @@ def _rsets4nsb(rsets, autostep):
         return rsets[0]
 
 
+class _ParseCache(object):
+    """
+    Private LRU cache used by ParsingEngine, bounded by both its number of
+    entries and the total weight (number of nodes) of its values. Shared
+    parsers may be used from several threads, so accesses are serialized.
+    """
+
+    def __init__(self, max_entries, max_weight):
+        self.max_entries = max_entries
+        self.max_weight = max_weight
+        self._entries = OrderedDict()  # key -> (value, weight)
+        self._weight = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Get value of key (marked as most recently used) or None."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            # re-insert entry to mark it as most recently used
+            self._entries[key] = entry
+            return entry[0]
+
+    def put(self, key, value, weight):
+        """Store value of key, unless its weight exceeds max_weight, and
+        evict least recently used entries as needed."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._weight -= entry[1]
+            if weight > self.max_weight:
+                return
+            self._entries[key] = (value, weight)
+            self._weight += weight
+            while len(self._entries) > self.max_entries or \
+                    self._weight > self.max_weight:
+                self._weight -= self._entries.popitem(last=False)[1][1]
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+            self._weight = 0
+
+
 class ParsingEngine(object):
     """
     Class that is able to transform a source into a NodeSetBase.
@@ -785,13 +942,34 @@ class ParsingEngine(object):
     BRACKET_OPEN = '['
     BRACKET_CLOSE = ']'
 
-    def __init__(self, group_resolver, node_wildcard_enable=True):
+    # regular expressions compiled once at class creation
+    OP_CODES_RE = re.compile(OP_CODES_PAT)
+    BRACKET_RE = re.compile(r"\[([^\]]*)\]")  # prefix[range]suffix
+    DIGITS_RE = re.compile(r"(\d+)")            # node index digits
+
+    # max number of parsed strings kept in cache (see parse_string())
+    PARSE_CACHE_MAX = 1024
+    # max total number of nodes of parsed strings kept in cache
+    PARSE_CACHE_MAX_NODES = 100000
+
+    def __init__(self, group_resolver, node_wildcard_enable=True,
+                 cache_enable=False):
         """
         Initialize Parsing Engine.
+
+        Parse results are only cached if cache_enable is set, which is
+        only worth it for parsers shared by many NodeSet objects.
         """
         self.group_resolver = group_resolver
-        self.base_node_re = re.compile(r"(\D*)(\d*)")
         self.node_wc = node_wildcard_enable  # node wildcard support
+        self.cache_enable = cache_enable
+        # LRU cache of parsed strings not depending on group resolution
+        self._parse_cache = _ParseCache(self.PARSE_CACHE_MAX,
+                                        self.PARSE_CACHE_MAX_NODES)
+        # cache of parsed groups: (group, namespace, autostep) -> tuple
+        # (resolver node list, NodeSetBase)
+        self._group_cache = _ParseCache(self.PARSE_CACHE_MAX,
+                                        self.PARSE_CACHE_MAX_NODES)
 
     def parse(self, nsobj, autostep):
         """
@@ -814,22 +992,37 @@ class ParsingEngine(object):
 
         raise TypeError("Unsupported NodeSet input %s" % type(nsobj))
 
-    def parse_string(self, nsstr, autostep, namespace=None):
+    def parse_string(self, nsstr, autostep, namespace=None, node_wc=None,
+                     cache=True):
         """Parse provided string in optional namespace.
 
         This method parses string, resolves all node groups, and
-        computes set operations.
+        computes set operations. Results that do not depend on group
+        resolution are kept in a bounded LRU cache, unless cache is False.
+        If node_wc is not None, it overrides node wildcard support of this
+        parser.
 
         Return a NodeSetBase object.
         """
+        if node_wc is None:
+            node_wc = self.node_wc
+        nsstr = _strip_escape(nsstr)
+        cache = cache and self.cache_enable
+        if cache:
+            cache_key = (nsstr, autostep, namespace, node_wc)
+            cached = self._parse_cache.get(cache_key)
+            if cached is not None:
+                return self._cache_copy(cached)
+
         alln_cache = None  # used to compute 'all nodes' only once
+        cacheable = cache  # False if result depends on group resolution
         nodeset = NodeSetBase()
-        nsstr = _strip_escape(nsstr)
 
         for opc, pat, rgnd in self._scan_string(nsstr, autostep):
             # Parser main debugging:
             #print "OPC %s PAT %s RANGESETS %s" % (opc, pat, rgnd)
             if self.group_resolver and pat[0] == '@':
+                cacheable = False
                 ns_group = NodeSetBase()
                 for nodegroup in NodeSetBase(pat, rgnd):
                     # parse/expand nodes group: get group string and namespace
@@ -839,12 +1032,14 @@ class ParsingEngine(object):
                         # recursively parse and aggregate result
                         ns_group.update(self.parse_string(ns_str_ext,
                                                           autostep,
-                                                          ns_nsp_ext))
+                                                          ns_nsp_ext,
+                                                          node_wc))
                 # perform operation
                 getattr(nodeset, opc)(ns_group)
 
-            elif self.group_resolver and self.node_wc and ('*' in pat or
-                                                           '?' in pat):
+            elif self.group_resolver and node_wc and ('*' in pat or
+                                                      '?' in pat):
+                cacheable = False
                 # We support ranges with wildcard mask by testing all nodes
                 # against each expanded mask (wcmasks).
                 wcmasks = (str(wcn) for wcn in NodeSetBase(pat, rgnd, False))
@@ -852,15 +1047,12 @@ class ParsingEngine(object):
                 # Our reference set is 'all nodes', we need to build it from
                 # NodeSetBase to iterate over each individual node.
                 if alln_cache is None:
-                    self.node_wc = False  # avoid infinite recursion
-                    try:
-                        nsb = NodeSetBase()
-                        for res in self.all_nodes(namespace):
-                            nsb.update(self.parse_string(res, autostep,
-                                                         namespace))
-                        alln_cache = set(str(node) for node in nsb)
-                    finally:
-                        self.node_wc = True
+                    nsb = NodeSetBase()
+                    for res in self.all_nodes(namespace):
+                        # disable wildcards to avoid infinite recursion
+                        nsb.update(self.parse_string(res, autostep,
+                                                     namespace, False))
+                    alln_cache = set(str(node) for node in nsb)
 
                 alln = alln_cache.copy()
 
@@ -878,11 +1070,27 @@ class ParsingEngine(object):
                         wcns.update(NodeSetBase(wcp, wcrgnd, False))
                 getattr(nodeset, opc)(wcns)
 
+            elif opc == 'update':
+                # most common case: add freshly parsed rangeset directly,
+                # no intermediate NodeSetBase object nor copy is needed
+                nodeset._add(pat, rgnd, copy_rangeset=False)
             else:
                 getattr(nodeset, opc)(NodeSetBase(pat, rgnd, False))
 
+        if cacheable:
+            # cache a private copy as returned object may be modified
+            self._parse_cache.put(cache_key, nodeset.copy(), len(nodeset))
+
         return nodeset
 
+    @staticmethod
+    def _cache_copy(nodeset):
+        """Return a copy of a cached NodeSetBase object, using current
+        default fold_axis like a newly parsed object."""
+        cpy = nodeset.copy()
+        cpy.fold_axis = DEFAULTS.fold_axis or None
+        return cpy
+
     def parse_string_single(self, nsstr, autostep):
         """Parse provided string and return a NodeSetBase object."""
         pat, rangesets = self._scan_string_single(_strip_escape(nsstr),
@@ -896,10 +1104,35 @@ class ParsingEngine(object):
         return NodeSetBase(pat, rgobj, False)
 
     def parse_group(self, group, namespace=None, autostep=None):
-        """Parse provided single group name (without @ prefix)."""
+        """Parse provided single group name (without @ prefix).
+
+        If caching is enabled, parsed groups are reused as long as the
+        group resolver returns the same node list.
+        """
         assert self.group_resolver is not None
-        nodestr = self.group_resolver.group_nodes(group, namespace)
-        return self.parse(",".join(nodestr), autostep)
+        nodelist = self.group_resolver.group_nodes(group, namespace)
+        cache_key = (group, namespace, autostep)
+        if self.cache_enable:
+            cached = self._group_cache.get(cache_key)
+            if cached is not None and cached[0] == nodelist:
+                return self._cache_copy(cached[1])
+        nodestr = ",".join(nodelist)
+        try:
+            # result is kept in group cache only
+            nodeset = self.parse_string(nodestr, autostep, cache=False)
+        except (NodeUtils.GroupSourceQueryFailed, RuntimeError) as exc:
+            raise NodeSetParseError(nodestr, str(exc))
+        # results depending on other groups or on wildcards are not kept
+        wildcards = '@*?' if self.node_wc else '@'
+        if self.cache_enable and \
+            not any(char in nsstr for nsstr in nodelist for char in wildcards):
+            self._group_cache.put(cache_key, (nodelist, nodeset.copy()),
+                                  len(nodeset))
+        return nodeset
+
+    def invalidate_group_cache(self):
+        """Drop all parsed groups kept by parse_group()."""
+        self._group_cache.clear()
 
     def parse_group_string(self, nodegroup, namespace=None):
         """Parse provided raw nodegroup string in optional namespace.
@@ -958,44 +1191,44 @@ class ParsingEngine(object):
 
     def _next_op(self, pat):
         """Opcode parsing subroutine."""
-        mobj = re.search(ParsingEngine.OP_CODES_PAT, pat)
+        mobj = self.OP_CODES_RE.search(pat)
         if mobj:
-            return mobj.span()[0], mobj.group()
+            return mobj.start(), mobj.group()
         else:
             return -1, None
 
     def _scan_string_single(self, nsstr, autostep):
         """Single node scan, returns (pat, list of rangesets)"""
         # single node parsing
-        pfx_nd = [mobj.groups() for mobj in self.base_node_re.finditer(nsstr)]
-        pfx_nd = pfx_nd[:-1]
-        if not pfx_nd:
+        if not nsstr:
             raise NodeSetParseError(nsstr, "parse error")
 
+        # split digit runs: [pfx0, idx0, pfx1, idx1, ..., sfx]
+        parts = self.DIGITS_RE.split(nsstr)
+        sfx = parts.pop()
+
         pat = ""
         rangesets = []
-        for pfx, idx in pfx_nd:
-            if idx:
-                # optimization: process single index padding directly
-                pad = 0
-                if int(idx) != 0:
-                    idxs = idx.lstrip("0")
-                    if len(idx) - len(idxs) > 0:
-                        pad = len(idx)
-                    idxint = int(idxs)
-                else:
-                    if len(idx) > 1:
-                        pad = len(idx)
-                    idxint = 0
-                if idxint > 1e100:
-                    raise NodeSetParseRangeError( \
-                        RangeSetParseError(idx, "invalid rangeset index"))
-                # optimization: use numerical RangeSet constructor
-                pat += "%s%%s" % pfx
-                rangesets.append(RangeSet.fromone(idxint, pad, autostep))
+        for pfx, idx in zip(parts[0::2], parts[1::2]):
+            # optimization: process single index padding directly
+            pad = 0
+            if int(idx) != 0:
+                idxs = idx.lstrip("0")
+                if len(idx) - len(idxs) > 0:
+                    pad = len(idx)
+                idxint = int(idxs)
             else:
-                # undefined pad means no node index
-                pat += pfx
+                if len(idx) > 1:
+                    pad = len(idx)
+                idxint = 0
+            if idxint > 1e100:
+                raise NodeSetParseRangeError( \
+                    RangeSetParseError(idx, "invalid rangeset index"))
+            # optimization: use numerical RangeSet constructor
+            pat += "%s%%s" % pfx
+            rangesets.append(RangeSet.fromone(idxint, pad, autostep))
+        # trailing part without node index
+        pat += sfx
         return pat, rangesets
 
     def _scan_string(self, nsstr, autostep):
@@ -1021,11 +1254,12 @@ class ParsingEngine(object):
                 newpat = ""
                 sfx = nsstr
                 while bracket_idx >= 0 and (op_idx > bracket_idx or op_idx < 0):
-                    pfx, sfx = sfx.split(self.BRACKET_OPEN, 1)
-                    try:
-                        rng, sfx = sfx.split(self.BRACKET_CLOSE, 1)
-                    except ValueError:
+                    # get prefix, range and suffix in one pass
+                    mobj = self.BRACKET_RE.search(sfx)
+                    if mobj is None:
                         raise NodeSetParseError(nsstr, "missing bracket")
+                    pfx, rng, sfx = sfx[:mobj.start()], mobj.group(1), \
+                                    sfx[mobj.end():]
 
                     # illegal closing bracket checks
                     if pfx.find(self.BRACKET_CLOSE) > -1:
@@ -1070,11 +1304,11 @@ class ParsingEngine(object):
                         raise NodeSetParseRangeError(ex)
 
                 # Check if we have a next op-separated node or pattern
-                op_idx, next_op_code = self._next_op(sfx)
+                # (op_idx was already computed by the last readahead)
                 if op_idx < 0:
                     nsstr = None
                 else:
-                    sfx, nsstr = sfx.split(next_op_code, 1)
+                    sfx, nsstr = sfx[:op_idx], sfx[op_idx + 1:]
                     # Detected character operator so right operand is mandatory
                     if not nsstr:
                         msg = "missing nodeset operand with '%s' " \
@@ -1095,7 +1329,7 @@ class ParsingEngine(object):
                     node = nsstr
                     nsstr = None # break next time
                 else:
-                    node, nsstr = nsstr.split(next_op_code, 1)
+                    node, nsstr = nsstr[:op_idx], nsstr[op_idx + 1:]
                     # Detected character operator so both operands are mandatory
                     if not node or not nsstr:
                         msg = "missing nodeset operand with '%s' " \
@@ -1198,6 +1432,11 @@ class NodeSet(NodeSetBase):
 
     _VERSION = 2
 
+    # When external reverse is available, internal reverse is abandoned as
+    # soon as the number of group nodes exceeds this factor times the size
+    # of the nodeset.
+    _REVERSE_VOLUME_FACTOR = 4
+
     def __init__(self, nodes=None, autostep=None, resolver=None,
                  fold_axis=None):
         """Initialize a NodeSet object.
@@ -1244,12 +1483,46 @@ class NodeSet(NodeSetBase):
         else:
             self._resolver = resolver or RESOLVER_STD_GROUP
 
-        # Initialize default parser.
-        if resolver == RESOLVER_NOINIT:
-            self._parser = None
-        else:
-            self._parser = ParsingEngine(self._resolver)
-            self.update(nodes)
+        # Default parser is created on first use (see _parser property).
+        self._parser_engine = None
+        if resolver != RESOLVER_NOINIT:
+            if isinstance(nodes, NodeSetBase):
+                # already parsed: copy patterns
+                NodeSetBase.update(self, nodes)
+            elif nodes is not None:
+                self.update(nodes)
+
+    def _parse_other(self, other):
+        """Return other if it is already a NodeSetBase object, or parse it
+        using this nodeset parser."""
+        if isinstance(other, NodeSetBase):
+            return other
+        return self._parser.parse(other, self._autostep)
+
+    def _get_parser(self):
+        """Get parser, creating default parser if needed."""
+        if self._parser_engine is None:
+            self._parser_engine = _parser_for(self._resolver)
+        return self._parser_engine
+
+    def _set_parser(self, parser):
+        """Set parser (None to use a default parser)."""
+        self._parser_engine = parser
+
+    _parser = property(_get_parser, _set_parser)
+
+    @classmethod
+    def _from_base(cls, base, autostep, resolver, parser):
+        """Class method that returns a new NodeSet referencing the patterns
+        of provided NodeSetBase object (no copy), using provided resolver and
+        parser objects (parser may be None to create it on first use)."""
+        inst = cls(resolver=RESOLVER_NOINIT)
+        inst._autostep = autostep
+        inst._resolver = resolver
+        inst._parser = parser
+        inst._patterns = base._patterns
+        inst._length = base._length
+        return inst
 
     @classmethod
     def _fromlist1(cls, nodelist, autostep=None, resolver=None):
@@ -1290,7 +1563,8 @@ class NodeSet(NodeSetBase):
         odict = self.__dict__.copy()
         odict['_version'] = NodeSet._VERSION
         del odict['_resolver']
-        del odict['_parser']
+        del odict['_parser_engine']
+        del odict['_sorted_pats']
         return odict
 
     def __setstate__(self, dic):
@@ -1298,7 +1572,9 @@ class NodeSet(NodeSetBase):
         resolver."""
         self.__dict__.update(dic)
         self._resolver = None
-        self._parser = ParsingEngine(None)
+        self._parser = _parser_for(None)
+        self._sorted_pats = None
+        self._length = None
         if getattr(self, '_version', 1) <= 1:
             self.fold_axis = None
             # if setting state from first version, a conversion is needed to
@@ -1315,22 +1591,19 @@ class NodeSet(NodeSetBase):
                 else:
                     self.update(pat)
 
-    def copy(self):
-        """Return a shallow copy of a NodeSet."""
+    def _empty_copy(self):
+        """Return a new empty NodeSet with the same settings."""
         cpy = self.__class__(resolver=RESOLVER_NOINIT)
-        dic = {}
-        for pat, rangeset in self._patterns.items():
-            if rangeset is None:
-                dic[pat] = None
-            else:
-                dic[pat] = rangeset.copy()
-        cpy._patterns = dic
         cpy.fold_axis = self.fold_axis
         cpy._autostep = self._autostep
         cpy._resolver = self._resolver
-        cpy._parser = self._parser
+        cpy._parser_engine = self._parser_engine
         return cpy
 
+    def copy(self):
+        """Return a shallow copy of a NodeSet."""
+        return NodeSetBase.copy(self)
+
     __copy__ = copy # For the copy module
 
     def _find_groups(self, node, namespace, allgroups):
@@ -1353,6 +1626,9 @@ class NodeSet(NodeSetBase):
         """Find node groups this nodeset belongs to. [private]"""
         if not self._resolver:
             raise NodeSetExternalError("No node group resolver")
+        groups_info = {}
+        if not self:
+            return groups_info # empty
         try:
             # Get all groups in specified group source.
             allgrplist = self._parser.grouplist(groupsource)
@@ -1360,38 +1636,60 @@ class NodeSet(NodeSetBase):
             # If list query failed, we still might be able to regroup
             # using reverse.
             allgrplist = None
-        groups_info = {}
         allgroups = {}
         # Check for external reverse presence, and also use the
         # following heuristic: external reverse is used only when number
         # of groups is greater than the NodeSet size.
-        if self._resolver.has_node_groups(groupsource) and \
-            (not allgrplist or len(allgrplist) >= len(self)):
+        self_len = len(self)
+        has_reverse = self._resolver.has_node_groups(groupsource)
+        if has_reverse and (not allgrplist or len(allgrplist) >= self_len):
             # use external reverse
             pass
         else:
             if not allgrplist: # list query failed and no way to reverse!
                 return groups_info # empty
+            # with external reverse available, stop populating allgroups
+            # if group nodes are much more numerous than our nodes
+            max_volume = self_len * self._REVERSE_VOLUME_FACTOR
+            volume = 0
             try:
                 # use internal reverse: populate allgroups
                 for grp in allgrplist:
-                    nodelist = self._resolver.group_nodes(grp, groupsource)
-                    allgroups[grp] = NodeSet(",".join(nodelist),
-                                             resolver=self._resolver)
+                    nodeset = self._parser.parse_group(grp, groupsource,
+                                                       autostep)
+                    allgroups[grp] = nodeset
+                    volume += len(nodeset)
+                    if has_reverse and volume > max_volume:
+                        # use external reverse
+                        allgroups = {}
+                        break
             except NodeUtils.GroupSourceQueryFailed as exc:
                 # External result inconsistency
                 raise NodeSetExternalError("Unable to map a group " \
                         "previously listed\n\tFailed command: %s" % exc)
 
-        # For each NodeSetBase in self, find its groups.
-        for node in self._iterbase():
-            for grp in self._find_groups(node, groupsource, allgroups):
-                if grp not in groups_info:
-                    nodes = self._parser.parse_group(grp, groupsource, autostep)
-                    groups_info[grp] = (1, nodes)
-                else:
-                    i, nodes = groups_info[grp]
-                    groups_info[grp] = (i + 1, nodes)
+        if allgroups:
+            # invert allgroups once to find node groups with dict lookups
+            node_index = {}
+            for grp, nodeset in allgroups.items():
+                for key in nodeset._iterkeys():
+                    node_index.setdefault(key, []).append(grp)
+            nodegroups = [node_index.get(key, ())
+                          for key in self._iterkeys()]
+        else:
+            nodegroups = (self._find_groups(node, groupsource, allgroups)
+                          for node in self._iterbase())
+
+        # For each node in self, count its groups.
+        counts = Counter(chain.from_iterable(nodegroups))
+
+        # Then get nodes of each group found as [count, nodes] buckets.
+        for grp, count in counts.items():
+            if allgroups:
+                nodes = allgroups[grp]
+            else:
+                nodes = self._parser.parse_group(grp, groupsource, autostep)
+            groups_info[grp] = [count, nodes]
         return groups_info
 
     def groups(self, groupsource=None, noprefix=False):
@@ -1426,18 +1724,21 @@ class NodeSet(NodeSetBase):
         if not groups:
             return str(self)
 
-        # Keep only groups that are full.
+        # Keep only groups that are full (negated size allows plain sort).
         fulls = []
         for k, (i, nodes) in groups.items():
-            assert i <= len(nodes)
-            if i == len(nodes):
-                fulls.append((i, k))
-
-        rest = NodeSet(self, resolver=RESOLVER_NOGROUP)
+            nlen = len(nodes)
+            assert i <= nlen
+            if i == nlen:
+                fulls.append((-i, k))
+        fulls.sort()
+
+        # only NodeSetBase objects are removed from rest: copy self
+        rest = self.copy()
         regrouped = NodeSet(resolver=RESOLVER_NOGROUP)
 
         # Build regrouped NodeSet by selecting largest groups first.
-        for _, grp in sorted(fulls, key=lambda x: (-x[0], x[1])):
+        for _, grp in fulls:
             if not overlap and groups[grp][1] not in rest:
                 continue
             if groupsource and not noprefix:
@@ -1457,15 +1758,31 @@ class NodeSet(NodeSetBase):
         """
         Report whether another nodeset contains this nodeset.
         """
-        nodeset = self._parser.parse(other, self._autostep)
-        return NodeSetBase.issuperset(nodeset, self)
+        nodeset = self._parse_other(other)
+        return nodeset._issuperset(self)
 
     def issuperset(self, other):
         """
         Report whether this nodeset contains another nodeset.
         """
-        nodeset = self._parser.parse(other, self._autostep)
-        return NodeSetBase.issuperset(self, nodeset)
+        nodeset = self._parse_other(other)
+        return self._issuperset(nodeset)
+
+    def intersection(self, other):
+        """
+        s.intersection(t) returns a new nodeset with elements common to s
+        and t.
+        """
+        nodeset = self._parse_other(other)
+        return NodeSetBase.intersection(self, nodeset)
+
+    def difference(self, other):
+        """
+        s.difference(t) returns a new nodeset with elements in s but not
+        in t.
+        """
+        nodeset = self._parse_other(other)
+        return NodeSetBase.difference(self, nodeset)
 
     def __getitem__(self, index):
         """
@@ -1476,9 +1793,8 @@ class NodeSet(NodeSetBase):
         if not isinstance(base, NodeSetBase):
             return base
         # return a real NodeSet
-        inst = NodeSet(autostep=self._autostep, resolver=self._resolver)
-        inst._patterns = base._patterns
-        return inst
+        return NodeSet._from_base(base, self._autostep, self._resolver,
+                                  self._parser_engine)
 
     def split(self, nbr):
         """
@@ -1495,11 +1811,11 @@ class NodeSet(NodeSetBase):
         assert(nbr > 0)
 
         # We put the same number of element in each sub-nodeset.
-        slice_size = len(self) // nbr
-        left = len(self) % nbr
+        self_len = len(self)
+        slice_size, left = divmod(self_len, nbr)
 
         begin = 0
-        for i in range(0, min(nbr, len(self))):
+        for i in range(0, min(nbr, self_len)):
             length = slice_size + int(i < left)
             yield self[begin:begin + length]
             begin += length
@@ -1508,15 +1824,30 @@ class NodeSet(NodeSetBase):
         """
         s.update(t) returns nodeset s with elements added from t.
         """
-        nodeset = self._parser.parse(other, self._autostep)
+        nodeset = self._parse_other(other)
         NodeSetBase.update(self, nodeset)
 
+    def updaten(self, others):
+        """
+        s.updaten(list) updates nodeset s with elements added from given list.
+        """
+        nodesets = []
+        strings = set()
+        for other in others:
+            # parse identical strings only once
+            if isinstance(other, basestring):
+                if other in strings:
+                    continue
+                strings.add(other)
+            nodesets.append(self._parse_other(other))
+        NodeSetBase.updaten(self, nodesets)
+
     def intersection_update(self, other):
         """
         s.intersection_update(t) returns nodeset s keeping only
         elements also found in t.
         """
-        nodeset = self._parser.parse(other, self._autostep)
+        nodeset = self._parse_other(other)
         NodeSetBase.intersection_update(self, nodeset)
 
     def difference_update(self, other, strict=False):
@@ -1525,7 +1856,7 @@ class NodeSet(NodeSetBase):
         found in t. If strict is True, raise KeyError if an
         element in t cannot be removed from s.
         """
-        nodeset = self._parser.parse(other, self._autostep)
+        nodeset = self._parse_other(other)
         NodeSetBase.difference_update(self, nodeset, strict)
 
     def symmetric_difference_update(self, other):
@@ -1533,14 +1864,43 @@ class NodeSet(NodeSetBase):
         s.symmetric_difference_update(t) returns nodeset s keeping all
         nodes that are in exactly one of the nodesets.
         """
-        nodeset = self._parser.parse(other, self._autostep)
+        nodeset = self._parse_other(other)
         NodeSetBase.symmetric_difference_update(self, nodeset)
 
 
+def _std_parser():
+    """
+    Get the shared ParsingEngine object bound to the current standard group
+    resolver.
+    """
+    global _STD_PARSER
+    if _STD_PARSER is None or \
+            _STD_PARSER.group_resolver is not RESOLVER_STD_GROUP:
+        _STD_PARSER = ParsingEngine(RESOLVER_STD_GROUP, cache_enable=True)
+    return _STD_PARSER
+
+def _parser_for(resolver):
+    """
+    Get a ParsingEngine object for the provided group resolver: shared, with
+    caching enabled, when resolver is None or the standard group resolver,
+    new and without caching otherwise.
+    """
+    global _NOGROUP_PARSER
+    if resolver is None:
+        if _NOGROUP_PARSER is None:
+            _NOGROUP_PARSER = ParsingEngine(None, cache_enable=True)
+        return _NOGROUP_PARSER
+    if resolver is RESOLVER_STD_GROUP:
+        return _std_parser()
+    return ParsingEngine(resolver)
+
 def expand(pat):
     """
     Commodity function that expands a nodeset pattern into a list of nodes.
     """
+    if isinstance(pat, basestring):
+        # no need for a NodeSet object
+        return list(_std_parser().parse(pat, None))
     return list(NodeSet(pat))
 
 def fold(pat):
@@ -1548,6 +1908,9 @@ def fold(pat):
     Commodity function that clean dups and fold provided pattern with ranges
     and "/step" support.
     """
+    if isinstance(pat, basestring):
+        # no need for a NodeSet object
+        return str(_std_parser().parse(pat, None))
     return str(NodeSet(pat))
 
 def grouplist(namespace=None, resolver=None):
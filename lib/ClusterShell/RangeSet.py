@@ -104,6 +104,7 @@ class RangeSet(set):
         :param pattern: optional string pattern
         :param autostep: optional autostep threshold
         """
+        self._sorted_cache = None  # sorted elements, reset on modification
         if pattern is None or isinstance(pattern, str):
             set.__init__(self)
         else:
@@ -221,8 +222,11 @@ class RangeSet(set):
         return int(len(self) > 0)
 
     def _sorted(self):
-        """Get sorted list from inner set."""
-        return sorted(set.__iter__(self))
+        """Get sorted tuple from inner set. The result is cached until the
+        RangeSet is modified."""
+        if self._sorted_cache is None:
+            self._sorted_cache = tuple(sorted(set.__iter__(self)))
+        return self._sorted_cache
 
     def __iter__(self):
         """Iterate over each element in RangeSet."""
@@ -250,6 +254,7 @@ class RangeSet(set):
     def __setstate__(self, dic):
         """called upon unpickling"""
         self.__dict__.update(dic)
+        self._sorted_cache = None
         if getattr(self, '_version', 0) < RangeSet._VERSION:
             # unpickle from old version?
             if getattr(self, '_version', 0) <= 1:
@@ -479,6 +484,7 @@ class RangeSet(set):
         if pad is not None and pad > 0 and self.padding is None:
             self.padding = pad
 
+        self._sorted_cache = None
         set.update(self, range(start, stop, step))
 
     def copy(self):
@@ -639,6 +645,7 @@ class RangeSet(set):
     def __ior__(self, other):
         """Update a RangeSet with the union of itself and another."""
         self._binary_sanity_check(other)
+        self._sorted_cache = None
         set.__ior__(self, other)
         return self
 
@@ -649,28 +656,33 @@ class RangeSet(set):
     def __iand__(self, other):
         """Update a RangeSet with the intersection of itself and another."""
         self._binary_sanity_check(other)
+        self._sorted_cache = None
         set.__iand__(self, other)
         return self
 
     def intersection_update(self, other):
         """Update a RangeSet with the intersection of itself and another."""
+        self._sorted_cache = None
         set.intersection_update(self, other)
 
     def __ixor__(self, other):
         """Update a RangeSet with the symmetric difference of itself and
         another."""
         self._binary_sanity_check(other)
+        self._sorted_cache = None
         set.symmetric_difference_update(self, other)
         return self
 
     def symmetric_difference_update(self, other):
         """Update a RangeSet with the symmetric difference of itself and
         another."""
+        self._sorted_cache = None
         set.symmetric_difference_update(self, other)
 
     def __isub__(self, other):
         """Remove all elements of another set from this RangeSet."""
         self._binary_sanity_check(other)
+        self._sorted_cache = None
         set.difference_update(self, other)
         return self
 
@@ -681,6 +693,7 @@ class RangeSet(set):
         (strict is a RangeSet addition)"""
         if strict and other not in self:
             raise KeyError(set.difference(other, self).pop())
+        self._sorted_cache = None
         set.difference_update(self, other)
 
     # Python dict-like mass mutations: update, clear
@@ -692,6 +705,7 @@ class RangeSet(set):
             if self.padding is None and iterable.padding is not None:
                 self.padding = iterable.padding
         assert not isinstance(iterable, str)
+        self._sorted_cache = None
         set.update(self, iterable)
 
     def updaten(self, rangesets):
@@ -708,6 +722,7 @@ class RangeSet(set):
 
     def clear(self):
         """Remove all elements from this RangeSet."""
+        self._sorted_cache = None
         set.clear(self)
         self.padding = None
 
@@ -721,6 +736,7 @@ class RangeSet(set):
         if pad is not None and pad > 0 and self.padding is None:
             self.padding = pad
 
+        self._sorted_cache = None
         set.add(self, int(element))
 
     def remove(self, element):
@@ -730,6 +746,7 @@ class RangeSet(set):
         :raises KeyError: element is not contained in RangeSet
         :raises ValueError: element is not castable to integer
         """
+        self._sorted_cache = None
         set.remove(self, int(element))
 
     def discard(self, element):
@@ -739,10 +756,19 @@ class RangeSet(set):
         """
         try:
             i = int(element)
+            self._sorted_cache = None
             set.discard(self, i)
         except ValueError:
             pass # ignore other object types
 
+    def pop(self):
+        """Remove and return an arbitrary element from the RangeSet.
+
+        :raises KeyError: RangeSet is empty
+        """
+        self._sorted_cache = None
+        return set.pop(self)
+
 
 class RangeSetND(object):
     """
@@ -1282,7 +1308,7 @@ class RangeSetND(object):
 
         If strict is True, raise KeyError if an element cannot be removed
         (strict is a RangeSet addition)"""
-        if strict and not other in self:
+        if strict and other not in self:
             raise KeyError(other.difference(self)[0])
 
         ergvx = other._veclist # read only
@@ -1371,7 +1397,7 @@ class RangeSetND(object):
             for ergvec in other._veclist:
                 irgvec = [rg.intersection(erg) \
                             for rg, erg in zip(rgvec, ergvec)]
-                if not empty_rset in irgvec:
+                if empty_rset not in irgvec:
                     tmp_rnd.update([irgvec])
         # substitute
         self.veclist = tmp_rnd.veclist
@@ -1164,6 +1164,37 @@ class NodeSetGroupTest(unittest.TestCase):
         nodeset = NodeSet("foo*", resolver=RESOLVER_NOGROUP)
         self.assertEqual(str(nodeset), "foo*")
 
+    def test_nodeset_wildcard_reentrant(self):
+        """test NodeSet wildcard parsing during all nodes resolution"""
+        class ReentrantSource(StaticGroupSource):
+            def _upcall_read(self, cmdtpl, args=dict()):
+                if cmdtpl == 'all' and self.parser is not None:
+                    # parse with the same parser in the middle of another
+                    # wildcard resolution (like another thread would do)
+                    parser, self.parser = self.parser, None
+                    self.nested = str(parser.parse("bar*", None))
+                return StaticGroupSource._upcall_read(self, cmdtpl, args)
+
+        source = ReentrantSource('reentrant', {'map': {},
+                                               'all': 'foo[1-2] bar[1-2]'})
+        parser = source.parser = ParsingEngine(GroupResolver(source))
+        self.assertEqual(str(parser.parse("foo*", None)), "foo[1-2]")
+        self.assertEqual(source.nested, "bar[1-2]")
+
+    def test_nodeset_group_multiple_items(self):
+        """test NodeSet with group resolving to multiple items"""
+        source = StaticGroupSource('multi',
+                                   {'map': {'a': 'foo[1-5] foo[4-6] @b',
+                                            'b': 'bar1 bar2',
+                                            'c': 'foo[1-5] foo[4-6]!foo5',
+                                            'd': 'foo[1-5] foo[4-6]&foo5'}})
+        res = GroupResolver(source)
+        self.assertEqual(str(NodeSet("@a", resolver=res)),
+                         "bar[1-2],foo[1-6]")
+        # set operations apply to the whole group content
+        self.assertEqual(str(NodeSet("@c", resolver=res)), "foo[1-4,6]")
+        self.assertEqual(str(NodeSet("@d", resolver=res)), "foo5")
+
 
 class NodeSetGroup2GSTest(unittest.TestCase):
 
@@ -1210,6 +1241,14 @@ class NodeSetGroup2GSTest(unittest.TestCase):
         self.assertEqual(str(nodeset1), str(nodeset2))
         self.assertEqual(str(nodeset1), "montana[4-5]")
 
+    def testGroupCommodityFunctions(self):
+        """test expand() and fold() with std group resolver"""
+        self.assertEqual(fold("@gpu,montana42"), "montana[38-42]")
+        self.assertEqual(expand("@source2:gpu!montana[39-40]"),
+                         ["montana38", "montana41"])
+        set_std_group_resolver(GroupResolver()) # dummy resolver
+        self.assertRaises(GroupResolverSourceError, fold, "@gpu")
+
     def testGroupListDefault(self):
         """test NodeSet group listing GroupResolver.grouplist()"""
         groups = std_group_resolver().grouplist()
@@ -1331,6 +1370,37 @@ class NodeSetRegroupTest(unittest.TestCase):
         self.assertEqual(nodeset.regroup(), "@chassis[1-3]")
         self.assertEqual(nodeset.regroup(), "@chassis[1-3]")
 
+    def testGroupInternalReverse(self):
+        """test NodeSet regroup using internal reverse"""
+        source = StaticGroupSource('internal',
+                                   {'map': {'pad': 'foo[01-02]',
+                                            'nd': 'bar[1-2]-[1-2]',
+                                            'single': 'idaho'},
+                                    'list': 'pad nd single'})
+        res = GroupResolver(source)
+        nodeset = NodeSet("foo[1-3],bar[1-2]-[1-2],idaho", resolver=res)
+        self.assertEqual(nodeset.regroup(), "@nd,@pad,@single,foo3")
+        nodeset = NodeSet("foo[01-02],bar1-[1-2],idaho", resolver=res)
+        self.assertEqual(nodeset.regroup(), "@pad,@single,bar1-[1-2]")
+
+    def testGroupReverseLargeGroups(self):
+        """test NodeSet regroup falling back to reverse with large groups"""
+        source = StaticGroupSource('reverse',
+                                   {'map': {'big': 'foo[1-100]',
+                                            'small': 'foo[1-2]',
+                                            'three': 'foo3'},
+                                    'list': 'small big',
+                                    'reverse': {'foo1': 'small big',
+                                                'foo2': 'small big',
+                                                'foo3': 'three big'}})
+        res = GroupResolver(source)
+        # reverse is only used when groups are much larger than the nodeset
+        nodeset = NodeSet("foo[1-3]", resolver=res)
+        self.assertEqual(nodeset.regroup(), "@small,@three")
+        nodeset = NodeSet("foo[1-30]", resolver=res)
+        self.assertEqual(nodeset.regroup(), "@small,foo[3-30]")
+        self.assertEqual(NodeSet(resolver=res).regroup(), "")
+
 class StaticGroupSource(UpcallGroupSource):
     """
     A memory only group source based on a provided dict.
@@ -1397,6 +1467,51 @@ class GroupSourceCacheTest(unittest.TestCase):
         self.assertEqual('something_else', str(NodeSet("@a", resolver=res)))
         self.assertEqual(len(source._cache['map']), 2)
 
+    def test_expired_cache_parser(self):
+        """test ParsingEngine cache with expired group source entries"""
+        source = StaticGroupSource('cache', {'map': {'a': 'foo1', 'b': 'foo2'} })
+        source.cache_time = 0.2
+        res = GroupResolver(source)
+        parser = ParsingEngine(res, cache_enable=True)
+
+        self.assertEqual("foo1", str(parser.parse("@a", None)))
+        self.assertEqual("foo[1-2]", str(parser.parse("@a,@b", None)))
+
+        # Be sure 0.2 cache time is expired (especially for old Python version)
+        time.sleep(0.25)
+
+        # group resolution results must not be cached by the parser
+        source._data['map']['a'] = 'something_else'
+        self.assertEqual('something_else', str(parser.parse("@a", None)))
+        self.assertEqual('foo2,something_else', str(parser.parse("@a,@b", None)))
+
+    def test_expired_cache_parse_group(self):
+        """test ParsingEngine.parse_group() cache with expired entries"""
+        source = StaticGroupSource('cache', {'map': {'a': 'foo[1-2]',
+                                                     'b': '@a foo3'} })
+        source.cache_time = 0.2
+        res = GroupResolver(source)
+        parser = ParsingEngine(res, cache_enable=True)
+
+        nodeset = parser.parse_group('a')
+        self.assertEqual("foo[1-2]", str(nodeset))
+        # parsed groups are only kept in the group cache
+        self.assertEqual(len(parser._group_cache), 1)
+        self.assertEqual(len(parser._parse_cache), 0)
+        self.assertEqual("foo[1-3]", str(parser.parse_group('b')))
+        # returned objects are safe to modify
+        nodeset.update(NodeSetBase("foo%s", RangeSet("4")))
+        self.assertEqual("foo[1-2]", str(parser.parse_group('a')))
+
+        # Be sure 0.2 cache time is expired (especially for old Python version)
+        time.sleep(0.25)
+
+        source._data['map']['a'] = 'something_else'
+        self.assertEqual('something_else', str(parser.parse_group('a')))
+        self.assertEqual('foo3,something_else', str(parser.parse_group('b')))
+        parser.invalidate_group_cache()
+        self.assertEqual('something_else', str(parser.parse_group('a')))
+
     def test_expired_cache_reverse(self):
         """test UpcallGroupSource expired cache entries (reverse)"""
         source = StaticGroupSource('cache',
@@ -8,12 +8,16 @@ import binascii
 import copy
 import pickle
 import sys
+import threading
 import unittest
 
+from ClusterShell.Defaults import DEFAULTS
 from ClusterShell.NodeSet import RangeSet, RangeSetND, NodeSet, fold, expand
 from ClusterShell.NodeSet import NodeSetBase, AUTOSTEP_DISABLED, \
                                  NodeSetError, NodeSetParseError, \
-                                 NodeSetParseRangeError
+                                 NodeSetParseRangeError, ParsingEngine, \
+                                 RESOLVER_NOGROUP
+from ClusterShell.NodeUtils import GroupResolver
 
 
 class NodeSetTest(unittest.TestCase):
@@ -81,6 +85,11 @@ class NodeSetTest(unittest.TestCase):
         nodeset.updaten(["cluster10", "cluster9"])
         self.assertEqual(str(nodeset), "cluster[0-5,8-10]")
         self.assertEqual(len(nodeset), 9)
+        nodeset.updaten([NodeSet("cluster[11-12]"), "bar[1-2],cluster20",
+                         NodeSet("bar2,cluster13,foo"), nodeset,
+                         "bar[1-2],cluster20"])
+        self.assertEqual(str(nodeset), "bar[1-2],cluster[0-5,8-13,20],foo")
+        self.assertEqual(len(nodeset), 16)
         # single nodes test
         nodeset = NodeSet.fromlist(["cluster0", "cluster1", "cluster", "wool",
                                     "cluster3"])
@@ -1544,6 +1553,19 @@ class NodeSetTest(unittest.TestCase):
         """test NodeSet fold() utility function"""
         self.assertEqual(fold("purple1,purple2,purple3"), "purple[1-3]")
 
+    def testFoldFunctionDefaultFoldAxis(self):
+        """test NodeSet fold() utility function with default fold_axis"""
+        self.assertEqual(fold("a[1-2]-[1-2]"), "a[1-2]-[1-2]")
+        fold_axis_save = DEFAULTS.fold_axis
+        try:
+            DEFAULTS.fold_axis = (0,)
+            self.assertEqual(fold("a[1-2]-[1-2]"), "a[1-2]-1,a[1-2]-2")
+            self.assertEqual(fold("a[1-2]-[1-2]"),
+                             str(NodeSet("a[1-2]-[1-2]")))
+        finally:
+            DEFAULTS.fold_axis = fold_axis_save
+        self.assertEqual(fold("a[1-2]-[1-2]"), "a[1-2]-[1-2]")
+
     def testEquality(self):
         """test NodeSet equality"""
         ns0_1 = NodeSet()
@@ -2759,3 +2781,175 @@ class NodeSetTest(unittest.TestCase):
         self.assertEqual(str(n1),
                          "[000,010,020,030,040,050,060,070,080,090,100]")
         self.assertEqual(len(n1), 11)
+
+    def test_parse_cache(self):
+        """test ParsingEngine parse cache"""
+        # caching is disabled by default
+        parser = ParsingEngine(None)
+        parser.parse_string("foo[1-5],bar", None)
+        self.assertEqual(len(parser._parse_cache), 0)
+        parser = ParsingEngine(None, cache_enable=True)
+        nsb1 = parser.parse_string("foo[1-5],bar", None)
+        nsb2 = parser.parse_string("foo[1-5],bar", None)
+        self.assertEqual(str(nsb1), "bar,foo[1-5]")
+        self.assertEqual(nsb1, nsb2)
+        # returned objects must be independent copies
+        nsb1.difference_update(parser.parse_string("foo[2-3]", None))
+        self.assertEqual(str(nsb1), "bar,foo[1,4-5]")
+        self.assertEqual(str(nsb2), "bar,foo[1-5]")
+        nsb3 = parser.parse_string("foo[1-5],bar", None)
+        self.assertEqual(str(nsb3), "bar,foo[1-5]")
+        # cache is bounded
+        for i in range(ParsingEngine.PARSE_CACHE_MAX + 10):
+            parser.parse_string("foo%d" % i, None)
+        self.assertEqual(len(parser._parse_cache), ParsingEngine.PARSE_CACHE_MAX)
+        # cache is also bounded by its total number of nodes
+        maxnodes = ParsingEngine.PARSE_CACHE_MAX_NODES
+        parser._parse_cache.clear()
+        parser.parse_string("foo[1-%d]" % (maxnodes + 1), None)
+        self.assertEqual(len(parser._parse_cache), 0)
+        parser.parse_string("foo[1-%d]" % (maxnodes // 2 + 1), None)
+        parser.parse_string("bar[1-%d]" % (maxnodes // 2 + 1), None)
+        self.assertEqual(len(parser._parse_cache), 1)
+        self.assertEqual(str(parser.parse_string("bar[1-10]", None)),
+                         "bar[1-10]")
+        self.assertEqual(len(parser._parse_cache), 2)
+
+    def test_parse_cache_threads(self):
+        """test ParsingEngine parse cache shared by threads"""
+        parser = ParsingEngine(None, cache_enable=True)
+        # small cache to make threads evict each other's entries
+        parser._parse_cache.max_entries = 4
+        errors = []
+
+        def parse_loop(tid):
+            try:
+                for i in range(2000):
+                    nsstr = "node%d-[1-%d]" % (tid, i % 10 + 1)
+                    nsb = parser.parse_string(nsstr, None)
+                    self.assertEqual(len(nsb), i % 10 + 1)
+            except Exception as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=parse_loop, args=(tid,))
+                   for tid in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        cache = parser._parse_cache
+        self.assertTrue(len(cache) <= 4)
+        self.assertEqual(cache._weight,
+                         sum(weight for _, weight in cache._entries.values()))
+
+    def test_shared_parser(self):
+        """test NodeSet shared parsers"""
+        nodeset1 = NodeSet("foo[1-2]")
+        nodeset2 = NodeSet("bar")
+        self.assertTrue(nodeset1._parser is nodeset2._parser)
+        nodeset1 = NodeSet("foo[1-2]", resolver=RESOLVER_NOGROUP)
+        nodeset2 = NodeSet("bar", resolver=RESOLVER_NOGROUP)
+        self.assertTrue(nodeset1._parser is nodeset2._parser)
+        self.assertTrue(nodeset1._parser.group_resolver is None)
+        self.assertTrue(nodeset1._parser.cache_enable)
+        # parsers of other resolvers are neither shared nor caching
+        resolver = GroupResolver()
+        nodeset3 = NodeSet("foo[1-2]", resolver=resolver)
+        nodeset4 = NodeSet("foo[1-2]", resolver=resolver)
+        self.assertFalse(nodeset3._parser is nodeset4._parser)
+        self.assertFalse(nodeset3._parser.cache_enable)
+        # parsing is not affected
+        nodeset1.update("foo[2-3]")
+        nodeset2.update(nodeset1)
+        self.assertEqual(str(nodeset1), "foo[1-3]")
+        self.assertEqual(str(nodeset2), "bar,foo[1-3]")
+
+    def test_sorted_patterns_cache(self):
+        """test NodeSet sorted patterns cache invalidation"""
+        nodeset = NodeSet("foo[1-2],bar")
+        self.assertEqual(list(nodeset), ["bar", "foo1", "foo2"])
+        nodeset.update("baz[1-2]")
+        self.assertEqual(list(nodeset), ["bar", "baz1", "baz2", "foo1", "foo2"])
+        self.assertEqual(nodeset[2], "baz2")
+        nodeset.difference_update("bar")
+        self.assertEqual(str(nodeset), "baz[1-2],foo[1-2]")
+        nodeset.intersection_update("foo[1-5]")
+        self.assertEqual(str(nodeset), "foo[1-2]")
+        nodeset.symmetric_difference_update("foo[2-3],aaa")
+        self.assertEqual(list(nodeset), ["aaa", "foo1", "foo3"])
+        nodeset2 = pickle.loads(pickle.dumps(nodeset))
+        nodeset2.update("abc")
+        self.assertEqual(str(nodeset2), "aaa,abc,foo[1,3]")
+        nodeset.clear()
+        self.assertEqual(list(nodeset), [])
+        self.assertEqual(str(nodeset), "")
+
+    def test_length_cache(self):
+        """test NodeSet length cache"""
+        nodeset = NodeSet("foo[1-10],bar")
+        self.assertEqual(len(nodeset), 11)
+        nodeset.update("foo[5-15]")
+        self.assertEqual(len(nodeset), 16)
+        nodeset.update("baz")
+        self.assertEqual(len(nodeset), 17)
+        nodeset.difference_update("foo[1-5],bar")
+        self.assertEqual(len(nodeset), 11)
+        nodeset.intersection_update("foo[1-10],baz")
+        self.assertEqual(len(nodeset), 6)
+        nodeset.symmetric_difference_update("foo[10-12],bar")
+        self.assertEqual(len(nodeset), 8)
+        self.assertEqual(len(nodeset.copy()), 8)
+        self.assertEqual(len(nodeset[2:]), 6)
+        self.assertEqual(len(pickle.loads(pickle.dumps(nodeset))), 8)
+        nodeset.clear()
+        self.assertEqual(len(nodeset), 0)
+
+    def test_iter_percent(self):
+        """test NodeSet iterator with '%' in node names"""
+        nodeset = NodeSet("a%b[1-2],c%%d[08-10]x%y,e%f")
+        self.assertEqual(list(nodeset), ["a%b1", "a%b2", "c%%d08x%y",
+                                         "c%%d09x%y", "c%%d10x%y", "e%f"])
+        nodeset = NodeSet("n%[1-2]c[01-02]")
+        self.assertEqual(list(nodeset), ["n%1c01", "n%1c02", "n%2c01",
+                                         "n%2c02"])
+
+    def test_binary_ops_new_object(self):
+        """test NodeSet intersection() and difference() results ownership"""
+        ns1 = NodeSet("foo[1-10],bar,baz[1-2]", autostep=3)
+        ns2 = NodeSet("foo[5-20],bar")
+        inter = ns1.intersection(ns2)
+        self.assertEqual(str(inter), "bar,foo[5-10]")
+        self.assertEqual(inter.autostep, 3)
+        inter.update("foo1")
+        diff = ns1.difference(ns2)
+        self.assertEqual(str(diff), "baz[1-2],foo[1-4]")
+        self.assertEqual(diff.autostep, 3)
+        diff.update("baz3")
+        diff.difference_update("foo1")
+        self.assertEqual(str(diff), "baz[1-3],foo[2-4]")
+        # source nodesets are left untouched
+        self.assertEqual(str(ns1), "bar,baz[1-2],foo[1-10]")
+        self.assertEqual(str(ns2), "bar,foo[5-20]")
+        # string arguments are supported
+        self.assertEqual(str(ns1.intersection("foo[2-3,42]")), "foo[2-3]")
+        self.assertEqual(str(ns1.difference("foo[2-10],baz")), "bar,baz[1-2],foo1")
+        self.assertEqual(ns1.difference(ns1), NodeSet())
+        self.assertEqual(ns1.intersection(ns1), ns1)
+
+    def test_update_ops_self(self):
+        """test NodeSet in-place operations with itself"""
+        nodeset = NodeSet("foo[1-10],bar")
+        nodeset.difference_update(nodeset)
+        self.assertEqual(len(nodeset), 0)
+        self.assertEqual(str(nodeset), "")
+        nodeset = NodeSet("foo[1-10],bar")
+        nodeset.symmetric_difference_update(nodeset)
+        self.assertEqual(len(nodeset), 0)
+        self.assertEqual(str(nodeset), "")
+        # strict removal failure keeps a consistent nodeset
+        nodeset = NodeSet("bar,foo[1-10]")
+        self.assertRaises(KeyError, nodeset.difference_update,
+                          NodeSet("bar,foo[1-12]"), True)
+        self.assertEqual(len(nodeset), len(list(nodeset)))
+        self.assertEqual(str(nodeset), str(NodeSet(",".join(nodeset))))
@@ -1104,3 +1104,32 @@ class RangeSetTest(unittest.TestCase):
         self.assertEqual(r0.dim(), 0)
         r1 = RangeSet("1-10,15-20")
         self.assertEqual(r1.dim(), 1)
+
+    def test_sorted_cache(self):
+        """test RangeSet sorted elements cache invalidation"""
+        r1 = RangeSet("1-3")
+        self.assertEqual(list(r1), [1, 2, 3])
+        r1.add(5)
+        self.assertEqual(list(r1), [1, 2, 3, 5])
+        r1.add_range(7, 9)
+        self.assertEqual(str(r1), "1-3,5,7-8")
+        r1.update([0])
+        self.assertEqual(r1[0], 0)
+        r1.remove(2)
+        r1.discard(3)
+        self.assertEqual(list(r1), [0, 1, 5, 7, 8])
+        r1.difference_update(RangeSet("7"))
+        r1.symmetric_difference_update(RangeSet("1,10"))
+        self.assertEqual(list(r1), [0, 5, 8, 10])
+        r1 |= RangeSet("11")
+        r1 -= RangeSet("0")
+        self.assertEqual(list(r1), [5, 8, 10, 11])
+        r1 &= RangeSet("5-10")
+        self.assertEqual(list(r1), [5, 8, 10])
+        r1 ^= RangeSet("5")
+        r1.intersection_update(RangeSet("8-42"))
+        self.assertEqual(list(r1), [8, 10])
+        elem = r1.pop()
+        self.assertEqual(list(r1), [x for x in [8, 10] if x != elem])
+        r1.clear()
+        self.assertEqual(list(r1), [])